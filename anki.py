@@ -2,10 +2,26 @@
 Anki deck creation and export functionality.
 """
 
+import io
 import os
-from typing import Dict, List
+import zlib
+from collections import Counter
+from itertools import chain
+from operator import attrgetter
+from typing import BinaryIO, Dict, List
 import genanki
 
+_get_model_name = attrgetter('model.name')
+
+
+def _deck_id(deck_name: str) -> int:
+    """
+    Derive a positive deck ID from the deck name. Uses CRC32 rather than the
+    builtin hash so the same name maps to the same ID across runs, letting
+    Anki update an existing deck on re-import.
+    """
+    return zlib.crc32(deck_name.encode('utf-8')) & 0x3FFFFFFF
+
 
 def create_deck(notes: list[genanki.Note], deck_name: str = "Extracted Cards") -> genanki.Deck:
     """
@@ -18,24 +34,29 @@ def create_deck(notes: list[genanki.Note], deck_name: str = "Extracted Cards") -
     Returns:
         genanki.Deck object ready for export
     """
-    # Create a unique deck ID based on the deck name
-    deck_id = hash(deck_name) % (10**9)  # Ensure it's a reasonable size
-    if deck_id < 0:
-        deck_id = -deck_id  # Make sure it's positive
-
-    # Create the deck
+    # Create the deck with a unique ID based on the deck name
     deck = genanki.Deck(
-        deck_id=deck_id,
+        deck_id=_deck_id(deck_name),
         name=deck_name
     )
 
-    # Add all notes to the deck
-    for note in notes:
-        deck.add_note(note)
+    # Add all notes to the deck in bulk
+    deck.notes.extend(notes)
 
     return deck
 
 
+def export_deck_to_fileobj(deck: genanki.Deck, fileobj: BinaryIO) -> None:
+    """
+    Export an Anki deck as .apkg data into a writable binary file object.
+
+    Args:
+        deck: genanki.Deck object to export
+        fileobj: Seekable binary file object to write the package into
+    """
+    genanki.Package(deck).write_to_file(fileobj)
+
+
 def export_deck(deck: genanki.Deck, output_path: str) -> None:
     """
     Export an Anki deck to a .apkg file.
@@ -45,15 +66,26 @@ def export_deck(deck: genanki.Deck, output_path: str) -> None:
         output_path: Path where the .apkg file should be saved
     """
     # Ensure the output directory exists
-    output_dir = os.path.dirname(output_path)
-    if output_dir and not os.path.exists(output_dir):
-        os.makedirs(output_dir)
+    if output_dir := os.path.dirname(output_path):
+        os.makedirs(output_dir, exist_ok=True)
 
-    # Create a package with the deck
-    package = genanki.Package(deck)
+    with open(output_path, 'wb') as f:
+        export_deck_to_fileobj(deck, f)
 
-    # Write the package to file
-    package.write_to_file(output_path)
+
+def export_deck_bytes(deck: genanki.Deck) -> bytes:
+    """
+    Export an Anki deck as in-memory .apkg bytes, without touching disk.
+
+    Args:
+        deck: genanki.Deck object to export
+
+    Returns:
+        Contents of the .apkg package
+    """
+    buf = io.BytesIO()
+    export_deck_to_fileobj(deck, buf)
+    return buf.getvalue()
 
 
 def create_and_export_deck(
@@ -83,31 +115,29 @@ def get_deck_statistics(deck: genanki.Deck) -> Dict[str, int]:
     Returns:
         Dictionary with statistics about the deck
     """
+    # Count notes by model and by tag in a single pass
+    model_counts = Counter()
+    tag_counts = Counter()
+    for note in deck.notes:
+        model_counts[_get_model_name(note)] += 1
+        tag_counts.update(note.tags)
+
     stats = {
         'total_notes': len(deck.notes),
-        'model_counts': {},
-        'tag_counts': {},
+        'model_counts': dict(model_counts),
+        'tag_counts': tag_counts,
     }
 
-    # Count notes by model
-    for note in deck.notes:
-        model_name = note.model.name
-        stats['model_counts'][model_name] = stats['model_counts'].get(model_name, 0) + 1
-
-    # Count notes by tags
-    for note in deck.notes:
-        for tag in note.tags:
-            stats['tag_counts'][tag] = stats['tag_counts'].get(tag, 0) + 1
-
     return stats
 
 
-def print_deck_summary(deck: genanki.Deck) -> None:
+def print_deck_summary(deck: genanki.Deck, max_tags: int = 50) -> None:
     """
     Print a summary of the deck contents.
 
     Args:
         deck: genanki.Deck object to summarize
+        max_tags: Maximum number of most common tags to list
     """
     stats = get_deck_statistics(deck)
 
@@ -121,7 +151,7 @@ def print_deck_summary(deck: genanki.Deck) -> None:
 
     if stats['tag_counts']:
         print("\nTag distribution:")
-        for tag, count in sorted(stats['tag_counts'].items()):
+        for tag, count in stats['tag_counts'].most_common(max_tags):
             print(f"  #{tag}: {count} notes")
 
 
@@ -136,8 +166,12 @@ def merge_decks(decks: List[genanki.Deck], merged_name: str = "Merged Deck") ->
     Returns:
         New genanki.Deck containing all notes from input decks
     """
-    all_notes = []
-    for deck in decks:
-        all_notes.extend(deck.notes)
+    merged = genanki.Deck(
+        deck_id=_deck_id(merged_name),
+        name=merged_name
+    )
+
+    # Take every note in one pass rather than copying and re-adding them
+    merged.notes = list(chain.from_iterable(deck.notes for deck in decks))
 
-    return create_deck(all_notes, merged_name)
+    return merged
@@ -3,11 +3,12 @@ Constants and data models for the Anki card extraction system.
 """
 
 import re
+from dataclasses import dataclass
 from enum import Enum
+from functools import cache
 
 import genanki
 from markdown_it.token import Token
-from pydantic import BaseModel
 
 
 FILE_SPLIT_PATTERN = re.compile(r"---\n")
@@ -93,109 +94,85 @@ ul p {
 }
 '''
 
-BASIC_CONTEXT_MODEL = genanki.Model(
-    1874134123,  # Unique model ID
-    'Basic with Context',
-    fields=[
-        {'name': 'FilePath'},
-        {'name': 'Context'},
-        {'name': 'Front'},
-        {'name': 'Back'},
-    ],
-    templates=[
-        {
-            'name': 'Card 1',
-            'qfmt': '''
-{{#FilePath}}<div class="filepath">{{FilePath}}</div>{{/FilePath}}
-{{#Context}}{{Context}}{{/Context}}
-{{Front}}
-<hr id="answer">
-''',
-            'afmt': '''
-{{#FilePath}}<div class="filepath">{{FilePath}}</div>{{/FilePath}}
-{{#Context}}{{Context}}{{/Context}}
-{{Front}}
-<hr id="answer">
-<div class="back">{{Back}}</div>
-''',
-        },
-    ],
-    css=CARD_CSS
-)
-
-BASIC_AND_REVERSED_CONTEXT_MODEL = genanki.Model(
-    1874134124,  # Unique model ID
-    'Basic with Context (and reversed)',
-    fields=[
-        {'name': 'FilePath'},
-        {'name': 'Context'},
-        {'name': 'Front'},
-        {'name': 'Back'},
-    ],
-    templates=[
-        {
-            'name': 'Card 1',
-            'qfmt': '''
-{{#FilePath}}<div class="filepath">{{FilePath}}</div>{{/FilePath}}
-{{#Context}}{{Context}}{{/Context}}
-{{Front}}
-<hr id="answer">
-<div class="back">{{Back}}</div>
-''',
-        },
-        {
-            'name': 'Card 2',
-            'qfmt': '''
-{{#FilePath}}<div class="filepath">{{FilePath}}</div>{{/FilePath}}
-{{#Context}}{{Context}}{{/Context}}
-{{Front}}
-<hr>
-''',
-            'afmt': '''
-{{#FilePath}}<div class="filepath">{{FilePath}}</div>{{/FilePath}}
-{{#Context}}{{Context}}{{/Context}}
-{{Front}}
-<hr id="answer">
-<div class="back">{{Back}}</div>
-''',
-        },
-        {
-            'name': 'Card 2',
-            'qfmt': '''
-{{#FilePath}}<div class="filepath">{{FilePath}}</div>{{/FilePath}}
-{{#Context}}{{Context}}{{/Context}}
-{{Back}}
-<hr id="answer">
-<div class="back">{{Front}}</div>
-''',
-        },
-    ],
-    css=CARD_CSS
-)
-
-CLOZE_CONTEXT_MODEL = genanki.Model(
-    model_id=1874134125,  # Unique model ID
-    name='Cloze with Context',
-    model_type=genanki.Model.CLOZE,
-    fields=[
-        {'name': 'Text'},
-        {'name': 'FilePath'},
-    ],
-    templates=[
-        {
-            'name': 'Cloze',
-            'qfmt': '''
-{{#FilePath}}<div class="filepath">{{FilePath}}</div>{{/FilePath}}
-{{cloze:Text}}
-''',
-            'afmt': '''
-{{#FilePath}}<div class="filepath">{{FilePath}}</div>{{/FilePath}}
-{{cloze:Text}}
-''',
-        },
-    ],
-    css=CARD_CSS
-)
+# Shared template fragments
+_FILEPATH_HEADER = '{{#FilePath}}<div class="filepath">{{FilePath}}</div>{{/FilePath}}\n'
+_CONTEXT_HEADER = _FILEPATH_HEADER + '{{#Context}}{{Context}}{{/Context}}\n'
+
+
+@cache
+def basic_context_model() -> genanki.Model:
+    """ Basic front/back model with file path and context fields. """
+    return genanki.Model(
+        1874134123,  # Unique model ID
+        'Basic with Context',
+        fields=[
+            {'name': 'FilePath'},
+            {'name': 'Context'},
+            {'name': 'Front'},
+            {'name': 'Back'},
+        ],
+        templates=[
+            {
+                'name': 'Card 1',
+                'qfmt': '\n' + _CONTEXT_HEADER + '{{Front}}\n<hr id="answer">\n',
+                'afmt': '\n' + _CONTEXT_HEADER + '{{Front}}\n<hr id="answer">\n<div class="back">{{Back}}</div>\n',
+            },
+        ],
+        css=CARD_CSS
+    )
+
+
+@cache
+def basic_and_reversed_context_model() -> genanki.Model:
+    """ Basic model that also generates a reversed card. """
+    return genanki.Model(
+        1874134124,  # Unique model ID
+        'Basic with Context (and reversed)',
+        fields=[
+            {'name': 'FilePath'},
+            {'name': 'Context'},
+            {'name': 'Front'},
+            {'name': 'Back'},
+        ],
+        templates=[
+            {
+                'name': 'Card 1',
+                'qfmt': '\n' + _CONTEXT_HEADER + '{{Front}}\n<hr id="answer">\n<div class="back">{{Back}}</div>\n',
+            },
+            {
+                'name': 'Card 2',
+                'qfmt': '\n' + _CONTEXT_HEADER + '{{Front}}\n<hr>\n',
+                'afmt': '\n' + _CONTEXT_HEADER + '{{Front}}\n<hr id="answer">\n<div class="back">{{Back}}</div>\n',
+            },
+            {
+                'name': 'Card 2',
+                'qfmt': '\n' + _CONTEXT_HEADER + '{{Back}}\n<hr id="answer">\n<div class="back">{{Front}}</div>\n',
+            },
+        ],
+        css=CARD_CSS
+    )
+
+
+@cache
+def cloze_context_model() -> genanki.Model:
+    """ Cloze model with a file path field. """
+    return genanki.Model(
+        model_id=1874134125,  # Unique model ID
+        name='Cloze with Context',
+        model_type=genanki.Model.CLOZE,
+        fields=[
+            {'name': 'Text'},
+            {'name': 'FilePath'},
+        ],
+        templates=[
+            {
+                'name': 'Cloze',
+                'qfmt': '\n' + _FILEPATH_HEADER + '{{cloze:Text}}\n',
+                'afmt': '\n' + _FILEPATH_HEADER + '{{cloze:Text}}\n',
+            },
+        ],
+        css=CARD_CSS
+    )
 
 
 class SymbolDirection(str, Enum):
@@ -204,7 +181,8 @@ class SymbolDirection(str, Enum):
     BIDIRECTIONAL = "bidirectional"
 
 
-class IndexCard(BaseModel):
+@dataclass(slots=True, frozen=True)
+class IndexCard:
     """ Represents a potential flashcard when scanning the document. """
     list_open_token_index: int
     inline_token_index: int
@@ -213,7 +191,8 @@ class IndexCard(BaseModel):
     list_close_token_index: int
 
 
-class IndexCloze(BaseModel):
+@dataclass(slots=True, frozen=True)
+class IndexCloze:
     list_open_token_index: int
     inline_token_index: int
     clozed_tokens: list[Token]
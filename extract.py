@@ -81,91 +81,157 @@ all items use the same cloze number (c1).
 """
 
 import re
-from copy import copy, deepcopy
+from collections.abc import Iterable
+from concurrent.futures import ProcessPoolExecutor
+from copy import copy
+from functools import cache, partial
+from itertools import count
 from pathlib import Path
 
 import genanki
 import yaml
-from bs4 import BeautifulSoup
 from markdown_it import MarkdownIt
 from markdown_it.token import Token
 from mdit_py_plugins import dollarmath, front_matter
 
-from const import (BASIC_AND_REVERSED_CONTEXT_MODEL, BASIC_CONTEXT_MODEL,
-                   CLOZE_CONTEXT_MODEL, FILE_SPLIT_PATTERN, INLINE_SYMBOL,
-                   IndexCard, IndexCloze, SymbolDirection)
+from const import (FILE_SPLIT_PATTERN, INLINE_SYMBOL, IndexCard, IndexCloze,
+                   SymbolDirection, basic_context_model, cloze_context_model)
 
+md_plain = MarkdownIt("commonmark").use(
+    dollarmath.dollarmath_plugin, double_inline=True, allow_space=False
+)
 md = (
     MarkdownIt("commonmark")
     .use(dollarmath.dollarmath_plugin, double_inline=True, allow_space=False)
     .use(front_matter.front_matter_plugin)
 )
+# Bound once since render is called for every card and context
+_MD_RENDER = md.renderer.render
+_MD_OPTIONS = md.options
+_MD_ENV: dict = {}
+
+_LIST_OPEN_TYPES = frozenset(("bullet_list_open", "ordered_list_open"))
+_LIST_CLOSE_TYPES = frozenset(("list_item_close", "bullet_list_close", "ordered_list_close"))
+
+_CLOZE_RE = re.compile(r"~~(\S(?:.*?\S)?)~~")
+_TAG_RE = re.compile(r"#([\w/][\w/-]*\w)")
+# Matches math elements as rendered by the dollarmath plugin. Labelled
+# equations contain a permalink element and are deliberately not matched.
+_MATH_RE = re.compile(r'<(div|span) class="math (inline|block)">([^<]*)</\1>')
+# Matches either a directional symbol (group 1) or a tag (group 2), as long as
+# it is not already wrapped in a span
+_FORMATTING_RE = re.compile(r'(?<!>)(?:(&lt;==&gt;|==&gt;|&lt;==)|(#[\w/][\w/-]*\w))(?![^<]*</span>)')
+
+
+def _may_contain_cards(text: str) -> bool:
+    """
+    Cheap check for whether text could hold any card: a card symbol (all of
+    which contain `==>` or `<==`), a cloze, or front matter for a file card.
+    """
+    return (
+        text.startswith('---')
+        or '==>' in text
+        or '<==' in text
+        or '~~' in text
+    )
+
+
+def _is_comment_token(token: Token) -> bool:
+    """Check whether a token is an HTML comment."""
+    return token.type in ('html_inline', 'html_block') and token.content.lstrip().startswith('<!--')
 
 
 def read_file(file_path: str) -> tuple[str, list[Token], set[str]]:
     """
     Read a markdown file, return its text content, token stream, and list of
-    tags from front matter if present.
+    tags from front matter if present. Files that cannot contain any card are
+    not parsed, and return an empty token stream.
     """
 
     with open(file_path, "r") as f:
         text = f.read()
 
-    if not text.strip():
+    if not _may_contain_cards(text):
         return text, [], set()
 
-    tokens = md.parse(text)
-    tokens = [
-        t for t in tokens
-        if not (t.type in ('html_inline', 'html_block') and t.content.strip().startswith('<!--'))
-    ]
+    # Front matter can only open the file, so skip its block rule otherwise
+    parsed = (md if text.startswith('---') else md_plain).parse(text)
 
     tags = set()
-    if tokens[0].type == 'front_matter':
-        front_matter = tokens.pop(0)
+    if parsed[0].type == 'front_matter':
+        front_matter = parsed.pop(0)
         tags = set(yaml.safe_load(front_matter.content).get('tags', []))
 
-    # Add index to token metadata
-    for i, token in enumerate(tokens):
-        token.meta['index'] = i
+    # Drop comments and add index to token metadata in a single pass
+    tokens = []
+    for token in parsed:
+        if _is_comment_token(token):
+            continue
+        token.meta['index'] = len(tokens)
+        tokens.append(token)
 
     return text, tokens, tags
 
 
+def _wrap_math(match: re.Match) -> str:
+    r"""
+    Wrap the content of a `_MATH_RE` match with \( or \[. Also, to prevent
+    clozes from improperly ending early, ensure that any occurrences of `}}`
+    are separated by a space.
+    """
+    tag, display, content = match.groups()
+    content = content.replace('}}', '} }')
+    if display == "block":
+        content = f"\\[ {content} \\]"
+    else:
+        content = f"\\( {content} \\)"
+    return f'<{tag} class="math {display}">{content}</{tag}>'
+
+
+def _wrap_formatting(match: re.Match) -> str:
+    """Wrap a `_FORMATTING_RE` match in a span according to what it matched."""
+    if symbol := match.group(1):
+        return f'<span class="formatting">{symbol}</span>'
+    return f'<span class="formatting tag">{match.group(2)}</span>'
+
+
 def render(list_of_tokens: list[Token]) -> str:
     r"""
     Render a list of markdown tokens into HTML, wrapping math spans with \( or
     \[ as needed based on their display class. Used for final Anki card
     rendering.
     """
-    soup = BeautifulSoup(md.renderer.render(list_of_tokens, md.options, {}), "html.parser")
-    # Wrap math spans with \( or \[ as needed based on class. Also, to prevent
-    # clozes from improperly ending early, ensure that any occurrences of `}}`
-    # are separated by a space.
-    for math_elem in soup.find_all(['div', 'span'], class_="math"):
-        math_content = math_elem.string
-        if math_content is not None:
-            math_content = math_content.replace('}}', '} }')
-            if "block" in math_elem["class"]:
-                math_elem.string = f"\\[ {math_content} \\]"
-            else:
-                math_elem.string = f"\\( {math_content} \\)"
-
-    html_content = str(soup)
+    html_content = _MD_RENDER(list_of_tokens, _MD_OPTIONS, _MD_ENV)
 
-    # Post-process to wrap symbols and tags with formatting spans
-    # Wrap directional symbols (but not those already in spans)
-    html_content = re.sub(r'(?<!>)(&lt;==&gt;|==&gt;|&lt;==)(?![^<]*</span>)', r'<span class="formatting">\1</span>', html_content)
+    # Wrap math spans with \( or \[ as needed based on class
+    html_content = _MATH_RE.sub(_wrap_math, html_content)
 
-    # Wrap tags (but not those already in spans)
-    html_content = re.sub(r'(?<!>)(#[\w/][\w/-]*\w)(?![^<]*</span>)', r'<span class="formatting tag">\1</span>', html_content)
+    # Post-process to wrap directional symbols and tags with formatting spans
+    # in a single pass (but not those already in spans). Every symbol contains
+    # `==` and every tag `#`, so the regex is skipped when neither is present.
+    if '==' in html_content or '#' in html_content:
+        html_content = _FORMATTING_RE.sub(_wrap_formatting, html_content)
 
     return f"\n{html_content}\n"
 
 
+@cache
+def _field_names(model: genanki.Model) -> tuple[str, ...]:
+    """ Field names of a model in order. Models are built once, so cache them. """
+    return tuple(field["name"] for field in model.fields)
+
+
 def _field_dict_to_list(field_dict: dict, model: genanki.Model) -> list:
     """ Uses the field order from a model to convert a field dict to a list. """
-    return [field_dict.get(field["name"], "") for field in model.fields]
+    return [field_dict.get(name, "") for name in _field_names(model)]
+
+
+def _make_note(model: genanki.Model, field_dict: dict, tags: set[str]) -> genanki.Note:
+    """
+    Create a note with fields in model order. Tags are sorted so that output
+    does not depend on set ordering.
+    """
+    return genanki.Note(model=model, fields=_field_dict_to_list(field_dict, model), tags=sorted(tags))
 
 
 def _build_filepath_context(file_path: str, parent_dir: str | None = None) -> str:
@@ -203,62 +269,80 @@ def _parse_regions_of_interest(
     card_indices: list[IndexCard] = []
     cloze_indices: list[IndexCloze] = []
 
+    # Single pass over the tokens to pair every list item open with its close,
+    # and to collect the candidate inline tokens that directly belong to a list
+    # item (i.e. appear before the item closes or opens a nested list). All
+    # symbols contain "==" and all clozes contain "~~", so inline tokens
+    # without either are never candidates.
+    close_index: dict[int, int] = {}
+    candidate_inlines: list[tuple[int, int]] = []
+    open_stack: list[int] = []
+    collecting = False
+
     for i, token in enumerate(tokens):
         if token.type == "list_item_open":
-            # Find next first inline token
-            for j in range(i + 1, len(tokens)):
-                if (inline := tokens[j]).type == "inline":
-                    # Check if any of the level 0 children contain the symbol
-                    for k, child in enumerate(inline.children):
-                        if child.type == "text" and child.level == 0:
-                            direction = _detect_symbol_direction(child.content)
-                            if direction is None:
-                                continue
-
-                            # Find where the list item closes, must be at the same level
-                            for l in range(j + 1, len(tokens)):
-                                if tokens[l].type == "list_item_close" and tokens[l].level == tokens[i].level:
-                                    break
-
-                            card_indices.append(IndexCard(
-                                list_open_token_index=i,
-                                inline_token_index=j,
-                                symbol_child_index=k,
-                                symbol_direction=direction,
-                                list_close_token_index=l
-                            ))
-                            break
-
-                    # Check if we have a cloze within the inline token
-                    cloze_pattern = re.compile(r"~~(\S(?:.*?\S)?)~~")
-                    if cloze_pattern.search(inline.content):
-                        clozed_content = cloze_pattern.sub(r"{{c0:: \1 }}", inline.content)
-                        # Replace the "c0" index with incrementing indices
-                        m = 1
-                        while (match := re.search(r"{{c(0)::", clozed_content)):
-                            clozed_content = clozed_content[0:match.start(1)] + str(m) + clozed_content[match.end(1):]
-                            m += 1
-
-                        clozed_tokens = md.parseInline(clozed_content)
-                        cloze_indices.append(IndexCloze(
-                            list_open_token_index=i,
-                            inline_token_index=j,
-                            clozed_tokens=clozed_tokens
-                        ))
-
-                elif tokens[j].type in ["list_item_close", "bullet_list_open", "ordered_list_open"]:
-                    # Reached the end of the list item without finding the symbol
+            open_stack.append(i)
+            collecting = True
+        elif token.type == "list_item_close":
+            close_index[open_stack.pop()] = i
+            collecting = False
+        elif token.type in _LIST_OPEN_TYPES:
+            collecting = False
+        elif (collecting and token.type == "inline"
+              and ("==" in token.content or "~~" in token.content)):
+            candidate_inlines.append((open_stack[-1], i))
+
+    for i, j in candidate_inlines:
+        inline = tokens[j]
+        if "==" in inline.content:
+            # Check if any of the level 0 children contain the symbol
+            for k, child in enumerate(inline.children):
+                if child.type == "text" and child.level == 0 and "==" in child.content:
+                    direction = _detect_symbol_direction(child.content)
+                    if direction is None:
+                        continue
+
+                    card_indices.append(IndexCard(
+                        list_open_token_index=i,
+                        inline_token_index=j,
+                        symbol_child_index=k,
+                        symbol_direction=direction,
+                        list_close_token_index=close_index.get(i, len(tokens) - 1)
+                    ))
                     break
 
+        # Check if we have a cloze within the inline token, numbering each
+        # cloze with an incrementing index as it is substituted
+        cloze_num = count(1)
+        clozed_content, num_clozes = _CLOZE_RE.subn(
+            lambda m: f"{{{{c{next(cloze_num)}:: {m.group(1)} }}}}", inline.content
+        )
+        if num_clozes:
+            clozed_tokens = md.parseInline(clozed_content)
+            cloze_indices.append(IndexCloze(
+                list_open_token_index=i,
+                inline_token_index=j,
+                clozed_tokens=clozed_tokens
+            ))
+
     return card_indices, cloze_indices
 
 
-def _create_cloze_tokens(content: str, cloze_num: int, is_list_item: bool = False) -> tuple[Token, Token]:
-    """Create cloze start and end tokens with appropriate spacing."""
+# Cloze bracket tokens are only ever read when rendering, so a single instance
+# of each can be shared by every card
+_CLOZE_END = Token(type='text', content=' }}', tag='', nesting=0)
+
+
+@cache
+def _cloze_start_token(cloze_num: int, is_list_item: bool) -> Token:
+    """Cloze start token, cached per cloze number and spacing since it is never mutated."""
     spacing = '' if is_list_item else ' '
-    cloze_start = Token(type='text', content=f'{spacing}{{{{c{cloze_num}:: ', tag='', nesting=0)
-    cloze_end = Token(type='text', content=' }}', tag='', nesting=0)
-    return cloze_start, cloze_end
+    return Token(type='text', content=f'{spacing}{{{{c{cloze_num}:: ', tag='', nesting=0)
+
+
+def _create_cloze_tokens(content: str, cloze_num: int, is_list_item: bool = False) -> tuple[Token, Token]:
+    """Get cloze start and end tokens with appropriate spacing."""
+    return _cloze_start_token(cloze_num, is_list_item), _CLOZE_END
 
 
 def _add_cloze_to_inline_token(token: Token, cloze_num: int, is_list_item: bool = False) -> None:
@@ -293,6 +377,17 @@ def _add_cloze_to_inline_token(token: Token, cloze_num: int, is_list_item: bool
             token.children.append(cloze_end)
 
 
+def _clozed_copy(token: Token, cloze_num: int, is_list_item: bool = False) -> Token:
+    """
+    Return a copy of an inline token with cloze brackets added, leaving the
+    original untouched. Only the children list is mutated, so only it is copied.
+    """
+    clozed = copy(token)
+    clozed.children = list(token.children)
+    _add_cloze_to_inline_token(clozed, cloze_num, is_list_item)
+    return clozed
+
+
 def _create_cloze_card(
     front_tokens: list[Token],
     back_tokens: list[Token],
@@ -318,38 +413,41 @@ def _create_cloze_card(
     # FIXME: Might be doing the wrong thing. Just want to wrap the front/back in
     # clozes accordingly; don't need to reverse the direction of their
     # appearance.
+    #
+    # Tokens are only copied where cloze brackets are added; everything else
+    # is shared with the source token stream.
     if symbol_direction == SymbolDirection.BACKWARD:
-        context_tokens, cloze_tokens = deepcopy(back_tokens), deepcopy(front_tokens)
+        context_tokens, cloze_tokens = back_tokens, list(front_tokens)
         if is_inline_card:
             # For backward inline cards, cloze the front content
-            for token in reversed(cloze_tokens):
-                if token.type == 'inline':
-                    _add_cloze_to_inline_token(token, 1)
+            for i in range(len(cloze_tokens) - 1, -1, -1):
+                if cloze_tokens[i].type == 'inline':
+                    cloze_tokens[i] = _clozed_copy(cloze_tokens[i], 1)
                     break
             final_tokens = cloze_tokens + context_tokens
         else:
             # For backward list cards, cloze the front content
-            for token in cloze_tokens:
+            for i, token in enumerate(cloze_tokens):
                 if token.type == 'inline':
-                    _add_cloze_to_inline_token(token, 1)
+                    cloze_tokens[i] = _clozed_copy(token, 1)
                     break
             final_tokens = cloze_tokens + context_tokens
     else:
         # Forward and bidirectional: cloze the back content
-        context_tokens, cloze_tokens = deepcopy(front_tokens), deepcopy(back_tokens)
+        context_tokens, cloze_tokens = front_tokens, list(back_tokens)
 
         if is_inline_card:
             # For inline cards, cloze the back content
-            for token in cloze_tokens:
+            for i, token in enumerate(cloze_tokens):
                 if token.type == 'inline':
-                    _add_cloze_to_inline_token(token, 1)
+                    cloze_tokens[i] = _clozed_copy(token, 1)
                     break
         else:
             # For list cards, add cloze brackets to each list item
             current_nesting = 0
             current_cloze_index = 1
 
-            for token in cloze_tokens:
+            for i, token in enumerate(cloze_tokens):
                 if token.type == "list_item_open":
                     current_nesting += 1
                 elif token.type == "list_item_close":
@@ -358,24 +456,45 @@ def _create_cloze_card(
                         current_cloze_index += 1
                 elif current_nesting > 0 and token.type == 'inline':
                     cloze_num = current_cloze_index if incremental else 1
-                    _add_cloze_to_inline_token(token, cloze_num, is_list_item=True)
+                    cloze_tokens[i] = _clozed_copy(token, cloze_num, is_list_item=True)
 
         hr_token = Token(type='hr', tag='hr', attrs={'class': 'context-separator'}, nesting=0)
         final_tokens = context_tokens + [hr_token] + cloze_tokens
 
-    return genanki.Note(
-        model=CLOZE_CONTEXT_MODEL,
-        fields=_field_dict_to_list({
-            'Text': list_context + render(final_tokens),
-            'FilePath': filepath_context,
-        }, CLOZE_CONTEXT_MODEL),
-        tags=tags,
-    )
+    return _make_note(cloze_context_model(), {
+        'Text': ''.join((list_context, render(final_tokens))),
+        'FilePath': filepath_context,
+    }, tags)
+
+
+def _heading_chains(tokens: list[Token]) -> list[tuple[tuple[int, int], ...]]:
+    """
+    Build, in one forward pass, the chain of headings in scope before each
+    token index. Each chain holds the (open, close) indices of the nearest
+    heading and then of each nearest earlier heading of a strictly lower level,
+    in document order. Level 6 headings are never used as context.
+    """
+    chains = []
+    chain = ()
+    heading_open_index = 0
+    for i, token in enumerate(tokens):
+        chains.append(chain)
+        if token.type == 'heading_open':
+            heading_open_index = i
+        elif token.type == 'heading_close':
+            heading_level = int(token.tag[1]) # e.g. 'h2' -> 2
+            if heading_level < 6:
+                # Drop headings at this level or deeper, they are out of scope
+                while chain and int(tokens[chain[-1][1]].tag[1]) >= heading_level:
+                    chain = chain[:-1]
+                chain = chain + ((heading_open_index, i),)
+    return chains
 
 
 def _find_prior_context(
     tokens: list[Token],
     list_open_token_index: int,
+    heading_chains: list[tuple[tuple[int, int], ...]],
 ) -> list[Token]:
     """
     Find the context tokens prior to the given list open token, consisting of
@@ -387,46 +506,40 @@ def _find_prior_context(
     # than the minimum we've currently seen.
     context_tokens = []
     min_level = tokens[list_open_token_index].level - 1
-    list_search = True
-    in_heading = False
-    min_heading = 6
     skipping = False
 
-    for token in tokens[list_open_token_index-1:None:-1]:
-        if list_search:
-            # Because siblings necessarily have a list_item_close, if we ever
-            # hit a close then we can skip until we reach a lower level.
-            if token.type == "list_item_close" or token.type == "bullet_list_close" or token.type == "ordered_list_close":
-                min_level = token.level - 1
-                skipping = True
-
-            if skipping:
-                if token.level <= min_level:
-                    skipping = False
-                else:
-                    continue
-
-            context_tokens.append(token)
-
-            if token.level == 0:
-                list_search = False
-
-        else:
-            # Heading search
-            if token.type == 'heading_close':
-                heading_level = int(token.tag[1]) # e.g. 'h2' -> 2
-                if heading_level < min_heading:
-                    in_heading = True
-                    min_heading = heading_level
+    for i in range(list_open_token_index - 1, -1, -1):
+        token = tokens[i]
+        # Because siblings necessarily have a list_item_close, if we ever
+        # hit a close then we can skip until we reach a lower level.
+        if token.type in _LIST_CLOSE_TYPES:
+            min_level = token.level - 1
+            skipping = True
+
+        if skipping:
+            if token.level <= min_level:
+                skipping = False
+            else:
+                continue
 
-            if in_heading:
-                context_tokens.append(token)
+        context_tokens.append(token)
 
-            if token.type == 'heading_open':
-                in_heading = False
+        if token.level == 0:
+            break
+    else:
+        # Never reached root level, so there are no headings to add
+        context_tokens.reverse()
+        return context_tokens
 
+    # Headings in scope before the root level token were found in the forward
+    # pass, so they are sliced in directly rather than searched for
     context_tokens.reverse()
-    return context_tokens
+    heading_tokens = [
+        token
+        for open_index, close_index in heading_chains[i]
+        for token in tokens[open_index:close_index + 1]
+    ]
+    return heading_tokens + context_tokens
 
 
 def _strip_trailing_closing_tags(context: str) -> str:
@@ -438,21 +551,59 @@ def _strip_trailing_closing_tags(context: str) -> str:
 
 
 def _build_context(tokens: list[Token], list_open_token_index: int, file_front_context: str,
-                   filepath_context: str, has_file_card: bool) -> tuple[str, str]:
-    """Build list and filepath context for a card."""
-    context_tokens = _find_prior_context(tokens, list_open_token_index)
-    list_context = render(context_tokens) if context_tokens else ''
-    list_context = _strip_trailing_closing_tags(list_context)
+                   filepath_context: str, has_file_card: bool,
+                   heading_chains: list[tuple[tuple[int, int], ...]],
+                   prior_context_cache: dict[int, list[Token]],
+                   context_cache: dict[tuple[int, ...], str]) -> tuple[str, str]:
+    """
+    Build list and filepath context for a card. Context tokens are memoized in
+    `prior_context_cache` by list open index, and rendered list contexts in
+    `context_cache` by the indices of the context tokens, since sibling cards
+    often share the same context.
+    """
+    if (context_tokens := prior_context_cache.get(list_open_token_index)) is None:
+        context_tokens = _find_prior_context(tokens, list_open_token_index, heading_chains)
+        prior_context_cache[list_open_token_index] = context_tokens
+    key = tuple(t.meta['index'] for t in context_tokens)
+    if (list_context := context_cache.get(key)) is None:
+        list_context = render(context_tokens) if context_tokens else ''
+        list_context = _strip_trailing_closing_tags(list_context)
+        context_cache[key] = list_context
 
     # Combine file context if this card is within a file card
-    full_list_context = (file_front_context + '<hr class="file-separator">' if has_file_card else '') + list_context
+    if has_file_card:
+        full_list_context = ''.join((file_front_context, '<hr class="file-separator">', list_context))
+    else:
+        full_list_context = list_context
     return full_list_context, filepath_context
 
 
 def _extract_tags(full_content_after_symbol: str) -> set[str]:
     """Extract tags from content."""
-    tag_pattern = r"#([\w/][\w/-]*\w)"
-    return set(re.findall(tag_pattern, full_content_after_symbol))
+    if '#' not in full_content_after_symbol:
+        return set()
+    return {m.group(1) for m in _TAG_RE.finditer(full_content_after_symbol)}
+
+
+def _split_text_child(child: Token, left_text: str, right_text: str) -> tuple[Token, Token]:
+    """
+    Split a text child into two new text tokens. Text is rendered from its
+    content alone, which is cheaper to build fresh than to copy.
+    """
+    return (
+        Token('text', '', 0, level=child.level, content=left_text),
+        Token('text', '', 0, level=child.level, content=right_text),
+    )
+
+
+def _has_nontag_content(content: str) -> bool:
+    """Check whether content has anything besides tags and whitespace."""
+    pos = 0
+    for m in _TAG_RE.finditer(content):
+        if content[pos:m.start()].strip():
+            return True
+        pos = m.end()
+    return bool(content[pos:].strip())
 
 
 def extract_cards(file_path: str, parent_dir: str | None = None) -> list[genanki.Note]:
@@ -471,13 +622,14 @@ def extract_cards(file_path: str, parent_dir: str | None = None) -> list[genanki
 
         try:
             # Split the text at the card split symbol
-            front_text, back_text = re.split(FILE_SPLIT_PATTERN, text, maxsplit=3)[2:]
+            front_text, back_text = FILE_SPLIT_PATTERN.split(text, maxsplit=3)[2:]
         except ValueError:
             print(f"File {file_path} does not contain a valid file card format.")
             return notes
 
         front_tokens = md.parse(front_text)
         back_tokens = md.parse(back_text)
+        rendered_front = render(front_tokens)
 
         # Incremental tags
         if 'incremental' in tags:
@@ -487,40 +639,36 @@ def extract_cards(file_path: str, parent_dir: str | None = None) -> list[genanki
                 filepath_context=filepath_context, list_context=''
             ))
         else:
-            notes.append(genanki.Note(
-                model=BASIC_CONTEXT_MODEL,
-                fields=_field_dict_to_list({
-                    'FilePath': filepath_context,
-                    'Context': '',
-                    'Front': render(front_tokens),
-                    'Back': render(back_tokens),
-                }, BASIC_CONTEXT_MODEL),
-                tags=tags,
-            ))
+            notes.append(_make_note(basic_context_model(), {
+                'FilePath': filepath_context,
+                'Context': '',
+                'Front': rendered_front,
+                'Back': render(back_tokens),
+            }, tags))
 
         # Store the file front content for context in nested cards
-        file_front_context = render(front_tokens)
+        file_front_context = rendered_front
 
     # Now check for inline and list flashcards. First we'll parse the tokens for
     # regions of interest, then extract the cards and context from those
     # regions.
     card_indices, cloze_indices = _parse_regions_of_interest(tokens)
+    heading_chains = _heading_chains(tokens) if card_indices or cloze_indices else []
+    prior_context_cache: dict[int, list[Token]] = {}
+    context_cache: dict[tuple[int, ...], str] = {}
 
     for region in card_indices:
         inline_token = tokens[region.inline_token_index]
         child = inline_token.children[region.symbol_child_index]
-        left_text, right_text = child.content.split(INLINE_SYMBOL[region.symbol_direction], 1)
+        symbol_text = INLINE_SYMBOL[region.symbol_direction]
+        left_text, _, right_text = child.content.partition(symbol_text)
 
         # Extract tags and determine card type
-        full_content_after_symbol = inline_token.content.split(INLINE_SYMBOL[region.symbol_direction], 1)[1]
+        _, _, full_content_after_symbol = inline_token.content.partition(symbol_text)
         tags = _extract_tags(full_content_after_symbol)
-        symbol_text = INLINE_SYMBOL[region.symbol_direction]
 
         # Determine if this is a list card (only tags after symbol, with nested list)
-        # Remove tags temporarily to check if there's any other content
-        tag_pattern = r"#[\w/][\w/-]*\w"
-        content_without_tags = re.sub(tag_pattern, '', full_content_after_symbol).strip()
-        is_list_card = not content_without_tags
+        is_list_card = not _has_nontag_content(full_content_after_symbol)
         if is_list_card:
             # Verify there's an immediate nested bullet list
             has_immediate_nested_list = any(
@@ -533,25 +681,13 @@ def extract_cards(file_path: str, parent_dir: str | None = None) -> list[genanki
 
         # Build front and back tokens based on card type
         if is_list_card:
-            # List card: front = question line with tags, back = nested list
-            modified_inline = copy(inline_token)
-            modified_child = copy(child)
-            modified_child.content = left_text + symbol_text + right_text
-
-            modified_inline.children = (
-                inline_token.children[:region.symbol_child_index] +
-                [modified_child] +
-                inline_token.children[region.symbol_child_index + 1:]
-            )
-
-            front_tokens = tokens[region.list_open_token_index:region.inline_token_index] + [modified_inline]
+            # List card: front = question line with tags, back = nested list. The
+            # question line is kept whole, so its inline token is used as is.
+            front_tokens = tokens[region.list_open_token_index:region.inline_token_index + 1]
             back_tokens = tokens[region.inline_token_index + 1:region.list_close_token_index + 1]
         else:
             # Inline card: split at symbol
-            left_child = copy(child)
-            left_child.content = left_text + symbol_text
-            right_child = copy(child)
-            right_child.content = right_text
+            left_child, right_child = _split_text_child(child, left_text + symbol_text, right_text)
 
             front_children = inline_token.children[:region.symbol_child_index] + [left_child]
             back_children = ([right_child] + inline_token.children[region.symbol_child_index + 1:]
@@ -567,7 +703,8 @@ def extract_cards(file_path: str, parent_dir: str | None = None) -> list[genanki
 
         # Build context and create cloze card
         full_list_context, full_filepath_context = _build_context(
-            tokens, region.list_open_token_index, file_front_context, filepath_context, "card" in tags
+            tokens, region.list_open_token_index, file_front_context, filepath_context, "card" in tags,
+            heading_chains, prior_context_cache, context_cache
         )
 
         is_incremental = 'incremental' in tags
@@ -582,19 +719,34 @@ def extract_cards(file_path: str, parent_dir: str | None = None) -> list[genanki
     for region in cloze_indices:
         # Build context and create cloze card
         full_list_context, full_filepath_context = _build_context(
-            tokens, region.list_open_token_index, file_front_context, filepath_context, "card" in tags
+            tokens, region.list_open_token_index, file_front_context, filepath_context, "card" in tags,
+            heading_chains, prior_context_cache, context_cache
         )
 
         # The final tokens are the list open until inline, and the modified clozed inline token
         text_tokens = tokens[region.list_open_token_index:region.inline_token_index] + region.clozed_tokens
 
-        notes.append(genanki.Note(
-            model=CLOZE_CONTEXT_MODEL,
-            fields=_field_dict_to_list({
-                'Text': full_list_context + '<hr class="context-separator">' + render(text_tokens),
-                'FilePath': full_filepath_context,
-            }, CLOZE_CONTEXT_MODEL),
-            tags=tags,
-        ))
+        notes.append(_make_note(cloze_context_model(), {
+            'Text': ''.join((full_list_context, '<hr class="context-separator">', render(text_tokens))),
+            'FilePath': full_filepath_context,
+        }, tags))
+
+    return notes
+
 
+def extract_cards_batch(
+    file_paths: Iterable[str],
+    parent_dir: str | None = None,
+    workers: int | None = None,
+) -> list[genanki.Note]:
+    """
+    Parse many markdown files in parallel across processes and return all of
+    their Anki notes, in the same order as `file_paths`.
+    """
+    notes = []
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for file_notes in executor.map(
+            partial(extract_cards, parent_dir=parent_dir), file_paths, chunksize=8
+        ):
+            notes.extend(file_notes)
     return notes
@@ -1,9 +1,10 @@
 import typer
 import rich
+from itertools import chain
 from pathlib import Path
 
 from anki import create_deck, export_deck
-from extract import extract_cards
+from extract import extract_cards, extract_cards_batch
 
 app = typer.Typer(
     no_args_is_help=True,
@@ -28,12 +29,15 @@ def main(
     """
     p = Path(path)
     if p.is_file():
-        files = [p]
+        files = None
     elif p.is_dir():
-        files = list(p.rglob("*.md"))
-        if not files:
+        # Walk the directory lazily; only peek far enough to know it has files
+        files = p.rglob("*.md")
+        first_file = next(files, None)
+        if first_file is None:
             print(f"No markdown files found in directory: {path}")
             raise typer.Exit(1)
+        files = chain([first_file], files)
     else:
         print(f"Path not found: {path}")
         raise typer.Exit(1)
@@ -50,10 +54,12 @@ def main(
     if not found_obsidian:
         parent_dir = str(search_path)
 
-    all_cards = []
-    for file in files:
-        cards = extract_cards(str(file), parent_dir=parent_dir)
-        all_cards.extend(cards)
+    # Files parse independently, so spread them across processes. A single
+    # file is not worth the pool startup cost.
+    if files is None:
+        all_cards = extract_cards(str(p), parent_dir=parent_dir)
+    else:
+        all_cards = extract_cards_batch(map(str, files), parent_dir=parent_dir)
 
     deck = create_deck(all_cards, deck_name=name)
 